@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import cached_property, lru_cache
 from typing import List
 import logging
 
@@ -11,7 +12,7 @@ class Settings(BaseSettings):
     download_base_url: str = ""  # Optional: Custom base URL for downloads (defaults to ytdlp_online_url)
     download_timeout: int = 300
     
-    @property
+    @cached_property
     def effective_download_base_url(self) -> str:
         """Get the effective download base URL (custom or default)."""
         return self.download_base_url.rstrip('/') if self.download_base_url else self.ytdlp_online_url.rstrip('/')
@@ -33,7 +34,7 @@ class Settings(BaseSettings):
     enable_log_file: bool = False
     log_file: str = "logs/app.log"
     
-    @property
+    @cached_property
     def log_level_int(self) -> int:
         """Get Python logging level constant from string."""
         level_map = {
@@ -51,7 +52,7 @@ class Settings(BaseSettings):
         case_sensitive=False
     )
     
-    @property
+    @cached_property
     def cors_origins_list(self) -> List[str]:
         """Parse CORS origins from comma-separated string."""
         if self.cors_origins == "*":
@@ -59,5 +60,11 @@ class Settings(BaseSettings):
         return [origin.strip() for origin in self.cors_origins.split(",")]
 
 
+@lru_cache
+def get_settings() -> Settings:
+    """Get the cached application settings (usable as a FastAPI dependency)."""
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
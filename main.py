@@ -1,9 +1,16 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers, QueryParams
 from config import settings
 from routers import router as download_router
-from utils import setup_logging, get_logger
-import time
+from routers.download import ytdlp_client
+from utils import setup_logging, shutdown_logging, get_logger
+from contextlib import asynccontextmanager
+import httpx
+import logging
+import orjson
+from time import perf_counter as _pc
 
 # Initialize logging
 setup_logging(
@@ -14,72 +21,108 @@ setup_logging(
 
 logger = get_logger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Log application startup and shutdown."""
+    banner = "=" * 60
+    logger.info(
+        f"{banner}\n"
+        f"Application starting: {settings.api_title}\n"
+        f"Version: {settings.api_version}\n"
+        f"Host: {settings.host}:{settings.port}\n"
+        f"CORS Origins: {settings.cors_origins}\n"
+        f"ytdlp.online URL: {settings.ytdlp_online_url}\n"
+        f"Download Base URL: {settings.effective_download_base_url}\n"
+        f"Download Timeout: {settings.download_timeout}s\n"
+        f"Log Level: {settings.log_level}\n"
+        f"File Logging: {'Enabled' if settings.enable_log_file else 'Disabled'}\n"
+        f"{banner}"
+    )
+    
+    yield
+    
+    logger.info("%s\nApplication shutting down gracefully\n%s", banner, banner)
+    await ytdlp_client.aclose()
+    shutdown_logging()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.api_title,
     version=settings.api_version,
     description=settings.api_description,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-logger.info(f"Initializing {settings.api_title} v{settings.api_version}")
+logger.info("Initializing %s v%s", settings.api_title, settings.api_version)
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Log application startup."""
-    logger.info("=" * 60)
-    logger.info(f"Application starting: {settings.api_title}")
-    logger.info(f"Version: {settings.api_version}")
-    logger.info(f"Host: {settings.host}:{settings.port}")
-    logger.info(f"CORS Origins: {settings.cors_origins}")
-    logger.info(f"ytdlp.online URL: {settings.ytdlp_online_url}")
-    logger.info(f"Download Base URL: {settings.effective_download_base_url}")
-    logger.info(f"Download Timeout: {settings.download_timeout}s")
-    logger.info(f"Log Level: {settings.log_level}")
-    logger.info(f"File Logging: {'Enabled' if settings.enable_log_file else 'Disabled'}")
-    logger.info("=" * 60)
+# Requests carrying more headers/params than this skip their debug dump
+MAX_LOGGED_ITEMS = 50
 
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Log application shutdown."""
-    logger.info("=" * 60)
-    logger.info("Application shutting down gracefully")
-    logger.info("=" * 60)
+# Health checks and static docs pages are not access-logged
+_SKIP_PATHS = frozenset({"/api/health", "/docs", "/redoc", "/openapi.json"})
 
 
 # Request/Response logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log all HTTP requests and responses."""
-    start_time = time.time()
+class AccessLogMiddleware:
+    """Pure ASGI middleware that logs all HTTP requests and responses."""
     
-    # Log incoming request
-    logger.info(
-        f"Request: {request.method} {request.url.path} | "
-        f"Client: {request.client.host if request.client else 'unknown'}"
-    )
-    logger.debug(f"Request headers: {dict(request.headers)}")
-    logger.debug(f"Request query params: {dict(request.query_params)}")
-    
-    # Process request
-    response = await call_next(request)
-    
-    # Log response
-    process_time = time.time() - start_time
-    logger.info(
-        f"Response: {request.method} {request.url.path} | "
-        f"Status: {response.status_code} | "
-        f"Time: {process_time:.3f}s"
-    )
+    def __init__(self, app):
+        self.app = app
     
-    return response
-
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in _SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        start = _pc()
+        method = scope["method"]
+        path = scope["path"]
+        client = scope.get("client")
+        
+        # Log incoming request
+        logger.info("Request: %s %s | Client: %s", method, path, client[0] if client else "unknown")
+        if logger.isEnabledFor(logging.DEBUG):
+            headers = Headers(scope=scope)
+            if len(headers) <= MAX_LOGGED_ITEMS:
+                logger.debug("Request headers: %s", orjson.dumps(dict(headers)).decode())
+            else:
+                logger.debug("Request headers: %d headers (not logged)", len(headers))
+            query_params = QueryParams(scope["query_string"])
+            if len(query_params) <= MAX_LOGGED_ITEMS:
+                logger.debug("Request query params: %s", orjson.dumps(dict(query_params)).decode())
+            else:
+                logger.debug("Request query params: %d params (not logged)", len(query_params))
+        
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        # Process request
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Log response
+            process_time = _pc() - start
+            logger.info(
+                "Response: %s %s | Status: %s | Time: %.3fs",
+                method, path, status_code, process_time
+            )
+
+
+app.add_middleware(AccessLogMiddleware)
 
 # Configure CORS
-logger.info(f"Configuring CORS with origins: {settings.cors_origins_list}")
+logger.info("Configuring CORS with origins: %s", settings.cors_origins_list)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
@@ -88,6 +131,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Centralized error handling for upstream failures. Endpoints connect to
+# ytdlp.online before responding, so connection and status errors surface here.
+# A catch-all Exception handler would run in ServerErrorMiddleware, which
+# re-raises after responding, so unexpected errors keep the default 500 path.
+@app.exception_handler(httpx.HTTPError)
+async def upstream_error_handler(request: Request, exc: httpx.HTTPError):
+    """Return a 500 response for an upstream HTTP failure."""
+    # Already logged by the client; only tie it to the request here
+    logger.error("Request failed: %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse({"detail": f"Download failed: {exc}"}, status_code=500)
+
+
 # Include routers
 logger.info("Registering download router")
 app.include_router(download_router)
@@ -115,7 +170,7 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    logger.info(f"Starting uvicorn server on {settings.host}:{settings.port}")
+    logger.info("Starting uvicorn server on %s:%s", settings.host, settings.port)
     uvicorn.run(
         "main:app",
         host=settings.host,
@@ -1,8 +1,34 @@
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 from typing import Optional, List
 from enum import Enum
 
 
+# OpenAPI examples
+_DOWNLOAD_REQUEST_EXAMPLE = {
+    "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "format": "mp4",
+    "quality": "720p",
+    "audio_only": False
+}
+
+_CUSTOM_DOWNLOAD_REQUEST_EXAMPLE = {
+    "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "params": ["-f", "bestvideo+bestaudio", "--merge-output-format", "mp4"]
+}
+
+_DOWNLOAD_RESPONSE_EXAMPLE = {
+    "status": "completed",
+    "download_url": "https://ytdlp.online/download/video.mp4",
+    "filename": "video.mp4",
+    "message": "Download completed successfully",
+    "progress": {
+        "status": "completed",
+        "message": "100% of 4.24MiB",
+        "percent": 100.0
+    }
+}
+
+
 class DownloadStatus(str, Enum):
     """Download status enumeration."""
     PENDING = "pending"
@@ -25,15 +51,11 @@ class DownloadRequest(BaseModel):
     subtitles: bool = Field(False, description="Download subtitles")
     subtitle_lang: Optional[str] = Field(None, description="Subtitle language code (e.g., en, es)")
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
-                "format": "mp4",
-                "quality": "720p",
-                "audio_only": False
-            }
-        }
+    model_config = ConfigDict(
+        frozen=True,
+        extra="forbid",
+        json_schema_extra={"example": _DOWNLOAD_REQUEST_EXAMPLE}
+    )
 
 
 class CustomDownloadRequest(BaseModel):
@@ -42,13 +64,11 @@ class CustomDownloadRequest(BaseModel):
     url: str = Field(..., description="Video URL to download")
     params: List[str] = Field(default_factory=list, description="Array of yt-dlp command-line parameters")
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
-                "params": ["-f", "bestvideo+bestaudio", "--merge-output-format", "mp4"]
-            }
-        }
+    model_config = ConfigDict(
+        frozen=True,
+        extra="forbid",
+        json_schema_extra={"example": _CUSTOM_DOWNLOAD_REQUEST_EXAMPLE}
+    )
 
 
 class DownloadProgress(BaseModel):
@@ -59,6 +79,8 @@ class DownloadProgress(BaseModel):
     percent: Optional[float] = None
     eta: Optional[str] = None
     speed: Optional[str] = None
+    
+    model_config = ConfigDict(frozen=True, extra="forbid")
 
 
 class DownloadResponse(BaseModel):
@@ -70,17 +92,8 @@ class DownloadResponse(BaseModel):
     message: str
     progress: Optional[DownloadProgress] = None
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "status": "completed",
-                "download_url": "https://ytdlp.online/download/video.mp4",
-                "filename": "video.mp4",
-                "message": "Download completed successfully",
-                "progress": {
-                    "status": "completed",
-                    "message": "100% of 4.24MiB",
-                    "percent": 100.0
-                }
-            }
-        }
+    model_config = ConfigDict(
+        frozen=True,
+        extra="forbid",
+        json_schema_extra={"example": _DOWNLOAD_RESPONSE_EXAMPLE}
+    )
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import StreamingResponse
+from functools import lru_cache
 from typing import Optional
 from models.schemas import (
     DownloadRequest,
@@ -8,7 +9,7 @@ from models.schemas import (
     DownloadStatus
 )
 from services.ytdlp_client import YtdlpClient
-from config import settings
+from config import Settings, get_settings, settings
 from utils import get_logger, get_sse_logger
 
 logger = get_logger(__name__)
@@ -23,20 +24,19 @@ ytdlp_client = YtdlpClient(
     timeout=settings.download_timeout
 )
 
+# SSE data line prefix
+_DATA_PREFIX = b"data: "
+_PFX_LEN = len(_DATA_PREFIX)
 
-@router.get("/health")
-async def health_check():
-    """Health check endpoint."""
-    logger.debug("Health check endpoint accessed")
-    return {
-        "status": "healthy",
-        "service": "ytdlp-online-api",
-        "version": settings.api_version
-    }
+# Response headers shared by all SSE endpoints
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
 
 
-@router.api_route("/download", methods=["GET", "POST"], response_class=StreamingResponse)
-async def download_video(
+async def common_download_params(
     url: str = Query(..., description="Video URL to download"),
     format: Optional[str] = Query(None, description="Video format (e.g., best, worst, mp4, webm)"),
     quality: Optional[str] = Query(None, description="Quality selection (e.g., best, 1080p, 720p, 480p)"),
@@ -47,68 +47,95 @@ async def download_video(
     output_template: Optional[str] = Query(None, description="Custom output filename template"),
     subtitles: bool = Query(False, description="Download subtitles"),
     subtitle_lang: Optional[str] = Query(None, description="Subtitle language code (e.g., en, es)")
-):
+) -> DownloadRequest:
+    """Collect the generic download query parameters into a DownloadRequest."""
+    return DownloadRequest(
+        url=url,
+        format=format,
+        quality=quality,
+        audio_only=audio_only,
+        audio_format=audio_format,
+        playlist=playlist,
+        playlist_items=playlist_items,
+        output_template=output_template,
+        subtitles=subtitles,
+        subtitle_lang=subtitle_lang
+    )
+
+
+@lru_cache(maxsize=1024)
+def _build_command(request: DownloadRequest) -> str:
+    """
+    Build (and memoize) the yt-dlp command for a generic download request.
+    
+    Args:
+        request: Download request (frozen, so it can serve as the cache key)
+        
+    Returns:
+        yt-dlp command string
+    """
+    logger.debug("Download request object: %s", request)
+    
+    return ytdlp_client.build_command_from_request(request)
+
+
+@router.get("/health")
+async def health_check(settings: Settings = Depends(get_settings)):
+    """Health check endpoint."""
+    logger.debug("Health check endpoint accessed")
+    return {
+        "status": "healthy",
+        "service": "ytdlp-online-api",
+        "version": settings.api_version
+    }
+
+
+@router.api_route("/download", methods=["GET", "POST"], response_class=StreamingResponse)
+async def download_video(request: DownloadRequest = Depends(common_download_params)):
     """
     Download video with generic parameters (SSE streaming).
     
     This endpoint streams download progress using Server-Sent Events (SSE).
     """
-    logger.info(f"Generic download request: URL={url}, format={format}, quality={quality}, audio_only={audio_only}")
-    
-    try:
-        # Build request object
-        request = DownloadRequest(
-            url=url,
-            format=format,
-            quality=quality,
-            audio_only=audio_only,
-            audio_format=audio_format,
-            playlist=playlist,
-            playlist_items=playlist_items,
-            output_template=output_template,
-            subtitles=subtitles,
-            subtitle_lang=subtitle_lang
-        )
-        logger.debug(f"Download request object: {request}")
-        
-        # Build command
-        command = ytdlp_client.build_command_from_request(request)
-        logger.info(f"Built command: {command}")
-        
-        # Start SSE stream tracking
-        stream_id = sse_logger.start_stream()
-        logger.info(f"Starting SSE stream: {stream_id}")
-        
-        # Stream response
-        async def event_stream():
-            try:
-                event_count = 0
-                async for line in ytdlp_client.stream_download(command):
-                    event_count += 1
-                    logger.debug(f"SSE [{stream_id}] Event {event_count}: {line[:100]}...")
-                    sse_logger.log_event(stream_id, line)
-                    yield f"{line}\n"
-                logger.info(f"SSE stream [{stream_id}] completed successfully with {event_count} events")
-                sse_logger.end_stream(stream_id, normal=True)
-            except Exception as e:
-                logger.error(f"SSE stream [{stream_id}] error: {e}", exc_info=True)
-                sse_logger.end_stream(stream_id, normal=False)
-                raise
-        
-        logger.debug(f"Returning SSE StreamingResponse for stream {stream_id}")
-        return StreamingResponse(
-            event_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no"
-            }
-        )
-    
-    except Exception as e:
-        logger.error(f"Download failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
+    logger.info(
+        "Generic download request: URL=%s, format=%s, quality=%s, audio_only=%s",
+        request.url, request.format, request.quality, request.audio_only
+    )
+    
+    # Build command
+    command = _build_command(request)
+    logger.info("Built command: %s", command)
+    
+    # Connect before responding so upstream failures still get a 500 response
+    lines = await ytdlp_client.open_stream(command)
+    
+    # Start SSE stream tracking
+    stream_id = sse_logger.start_stream()
+    logger.info("Starting SSE stream: %s", stream_id)
+    
+    # Stream response
+    async def event_stream():
+        try:
+            event_count = 0
+            log_event = sse_logger.log_event
+            async for line in lines:
+                event_count += 1
+                log_event(stream_id, line)
+                yield line
+            logger.info("SSE stream [%s] completed successfully with %d events", stream_id, event_count)
+            sse_logger.end_stream(stream_id, normal=True)
+        except Exception as e:
+            # Re-raised below, so the server reports the traceback
+            logger.error("SSE stream [%s] error: %s", stream_id, e)
+            sse_logger.end_stream(stream_id, normal=False)
+            raise
+    
+    logger.debug("Returning SSE StreamingResponse for stream %s", stream_id)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS
+    )
 
 
 @router.post("/download/custom", response_class=StreamingResponse)
@@ -118,132 +145,95 @@ async def download_custom(request: CustomDownloadRequest):
     
     This endpoint allows full control over yt-dlp options and streams progress using SSE.
     """
-    logger.info(f"Custom download request: URL={request.url}, params={request.params}")
+    logger.info("Custom download request: URL=%s, params=%s", request.url, request.params)
     
-    try:
-        # Build command
-        command = ytdlp_client.build_custom_command(request.url, request.params)
-        logger.info(f"Built custom command: {command}")
-        
-        # Start SSE stream tracking
-        stream_id = sse_logger.start_stream()
-        logger.info(f"Starting custom SSE stream: {stream_id}")
-        
-        # Stream response
-        async def event_stream():
-            try:
-                event_count = 0
-                async for line in ytdlp_client.stream_download(command):
-                    event_count += 1
-                    logger.debug(f"SSE [{stream_id}] Custom event {event_count}: {line[:100]}...")
-                    sse_logger.log_event(stream_id, line)
-                    yield f"{line}\n"
-                logger.info(f"Custom SSE stream [{stream_id}] completed with {event_count} events")
-                sse_logger.end_stream(stream_id, normal=True)
-            except Exception as e:
-                logger.error(f"Custom SSE stream [{stream_id}] error: {e}", exc_info=True)
-                sse_logger.end_stream(stream_id, normal=False)
-                raise
-        
-        return StreamingResponse(
-            event_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no"
-            }
-        )
+    # Build command
+    command = ytdlp_client.build_custom_command(request.url, request.params)
+    logger.info("Built custom command: %s", command)
+    
+    # Connect before responding so upstream failures still get a 500 response
+    lines = await ytdlp_client.open_stream(command)
+    
+    # Start SSE stream tracking
+    stream_id = sse_logger.start_stream()
+    logger.info("Starting custom SSE stream: %s", stream_id)
     
-    except Exception as e:
-        logger.error(f"Custom download failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
+    # Stream response
+    async def event_stream():
+        try:
+            event_count = 0
+            log_event = sse_logger.log_event
+            async for line in lines:
+                event_count += 1
+                log_event(stream_id, line)
+                yield line
+            logger.info("Custom SSE stream [%s] completed with %d events", stream_id, event_count)
+            sse_logger.end_stream(stream_id, normal=True)
+        except Exception as e:
+            logger.error("Custom SSE stream [%s] error: %s", stream_id, e)
+            sse_logger.end_stream(stream_id, normal=False)
+            raise
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS
+    )
 
 
 @router.api_route("/download/sync", methods=["GET", "POST"], response_model=DownloadResponse)
-async def download_sync(
-    url: str = Query(..., description="Video URL to download"),
-    format: Optional[str] = Query(None, description="Video format (e.g., best, worst, mp4, webm)"),
-    quality: Optional[str] = Query(None, description="Quality selection (e.g., best, 1080p, 720p, 480p)"),
-    audio_only: bool = Query(False, description="Extract audio only"),
-    audio_format: Optional[str] = Query(None, description="Audio format (e.g., mp3, aac, m4a)"),
-    playlist: bool = Query(False, description="Download entire playlist"),
-    playlist_items: Optional[str] = Query(None, description="Specific playlist items (e.g., 1-5,8,10-12)"),
-    output_template: Optional[str] = Query(None, description="Custom output filename template"),
-    subtitles: bool = Query(False, description="Download subtitles"),
-    subtitle_lang: Optional[str] = Query(None, description="Subtitle language code (e.g., en, es)")
-):
+async def download_sync(request: DownloadRequest = Depends(common_download_params)):
     """
     Download video synchronously and wait for completion.
     
     This endpoint waits for the download to complete and returns the download URL.
     """
-    logger.info(f"Sync download request: URL={url}, format={format}, quality={quality}")
-    
-    try:
-        # Build request object
-        request = DownloadRequest(
-            url=url,
-            format=format,
-            quality=quality,
-            audio_only=audio_only,
-            audio_format=audio_format,
-            playlist=playlist,
-            playlist_items=playlist_items,
-            output_template=output_template,
-            subtitles=subtitles,
-            subtitle_lang=subtitle_lang
-        )
-        logger.debug(f"Sync download request object: {request}")
-        
-        # Build command
-        command = ytdlp_client.build_command_from_request(request)
-        logger.info(f"Sync download command: {command}")
-        
-        # Execute synchronous download
-        logger.info("Starting synchronous download...")
-        result = await ytdlp_client.download_sync(command)
-        
-        logger.info(
-            f"Sync download completed: status={result['status']}, "
-            f"download_url={result.get('download_url', 'N/A')}, "
-            f"filename={result.get('filename', 'N/A')}"
-        )
-        
-        return DownloadResponse(**result)
+    logger.info(
+        "Sync download request: URL=%s, format=%s, quality=%s",
+        request.url, request.format, request.quality
+    )
+    
+    # Build command
+    command = _build_command(request)
+    logger.info("Sync download command: %s", command)
     
-    except Exception as e:
-        logger.error(f"Sync download failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
+    # Execute synchronous download
+    logger.info("Starting synchronous download...")
+    result = await ytdlp_client.download_sync(command)
+    
+    logger.info(
+        "Sync download completed: status=%s, download_url=%s, filename=%s",
+        result['status'].value, result.get('download_url', 'N/A'), result.get('filename', 'N/A')
+    )
+    
+    return DownloadResponse(**result)
 
 
-@router.get("/help")
+@router.get("/help", response_class=StreamingResponse)
 async def get_help():
     """
     Get yt-dlp help information.
     
-    Returns the full help text from yt-dlp to discover available options.
+    Streams the full help text from yt-dlp as plain text to discover available options.
     """
     logger.info("Help endpoint accessed")
     
-    try:
-        command = "yt-dlp --help"
-        logger.debug(f"Executing help command: {command}")
-        
-        help_text = []
-        line_count = 0
-        async for line in ytdlp_client.stream_download(command):
-            if line.startswith("data: "):
-                help_text.append(line[6:].strip())
-                line_count += 1
-        
-        logger.info(f"Help text retrieved successfully: {line_count} lines")
-        
-        return {
-            "command": command,
-            "help": "\n".join(help_text)
-        }
-    
-    except Exception as e:
-        logger.error(f"Failed to fetch help: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to fetch help: {str(e)}")
+    command = "yt-dlp --help"
+    logger.debug("Executing help command: %s", command)
+    
+    # Connect before responding so upstream failures still get a 500 response
+    lines = await ytdlp_client.open_stream(command)
+    
+    async def help_stream():
+        try:
+            line_count = 0
+            async for line in lines:
+                if line.startswith(_DATA_PREFIX):
+                    line_count += 1
+                    yield line[_PFX_LEN:].rstrip() + b"\n"
+            logger.info("Help text retrieved successfully: %d lines", line_count)
+        except Exception as e:
+            logger.error("Failed to fetch help: %s", e)
+            raise
+    
+    return StreamingResponse(help_stream(), media_type="text/plain")
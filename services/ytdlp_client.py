@@ -1,12 +1,27 @@
 import httpx
+import logging
 import re
+import shlex
 from typing import AsyncGenerator, Optional, Dict, List
-from urllib.parse import quote
+from urllib.parse import unquote
 from models.schemas import DownloadRequest, DownloadStatus, DownloadProgress
 from utils import get_logger
 
 logger = get_logger(__name__)
 
+# Patterns used to parse synchronous download output
+# One alternation scanned once per line; the matching branch is named by lastgroup
+_SSE_EVENT_RE = re.compile(
+    r'href="(?P<href>https?://[^"]+/download/[^"]+)"'
+    r'|\[download\]\s+(?P<pct>\d+\.?\d*)%\s+of\s+(?P<size>[\d.]+\w+)'
+    r'|(?P<done>Command execution completed|100%)'
+    r'|(?P<err>(?i:error|failed))'
+)
+_FILENAME_RE = re.compile(r'/download/(.+)$')
+
+# SSE line terminators: CRLF, LF or a bare CR
+_EOL_RE = re.compile(rb'\r\n?|\n')
+
 
 class YtdlpClient:
     """Client for interacting with ytdlp.online API."""
@@ -24,11 +39,39 @@ class YtdlpClient:
         self.download_base_url = (download_base_url or base_url).rstrip('/')
         self.timeout = timeout
         
+        # Long-lived HTTP client so connections are pooled across downloads
+        self._client = httpx.AsyncClient(timeout=self.timeout, http2=True)
+        
+        # Fixed-prefix rewrite of relative download links
+        self._href_needle_b = b'href="/download/'
+        self._href_replacement_b = f'href="{self.download_base_url}/download/'.encode("utf-8")
+        
         logger.info(
-            f"YtdlpClient initialized: base_url={self.base_url}, "
-            f"download_base_url={self.download_base_url}, timeout={self.timeout}s"
+            "YtdlpClient initialized: base_url=%s, download_base_url=%s, timeout=%ss",
+            self.base_url, self.download_base_url, self.timeout
         )
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Return the pooled HTTP client, creating a new one if it was closed.
+        
+        The module-level client outlives a single app lifespan, whose
+        shutdown closes the pool; a later start in the same process then
+        gets a fresh one.
+        
+        Returns:
+            Open httpx client
+        """
+        if self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, http2=True)
+            logger.info("YtdlpClient HTTP client recreated")
+        return self._client
+    
+    async def aclose(self):
+        """Close the underlying HTTP client and its connection pool."""
+        await self._client.aclose()
+        logger.info("YtdlpClient HTTP client closed")
+    
     def build_command_from_request(self, request: DownloadRequest) -> str:
         """
         Build yt-dlp command from DownloadRequest parameters.
@@ -39,7 +82,9 @@ class YtdlpClient:
         Returns:
             yt-dlp command string
         """
-        logger.debug(f"Building command from request: url={request.url}")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Building command from request: url=%s", request.url)
         parts = ["yt-dlp"]
         
         # Format selection
@@ -47,12 +92,14 @@ class YtdlpClient:
             logger.debug("Adding audio extraction options")
             parts.append("-x")  # Extract audio
             if request.audio_format:
-                logger.debug(f"Audio format: {request.audio_format}")
+                if debug:
+                    logger.debug("Audio format: %s", request.audio_format)
                 parts.extend(["--audio-format", request.audio_format])
         elif request.format:
             # Handle quality-based format selection
             if request.quality:
-                logger.debug(f"Quality-based format selection: {request.quality}")
+                if debug:
+                    logger.debug("Quality-based format selection: %s", request.quality)
                 if request.quality.lower() == "best":
                     parts.extend(["-f", "bestvideo+bestaudio/best"])
                 elif request.quality.endswith("p"):
@@ -60,7 +107,8 @@ class YtdlpClient:
                     height = request.quality[:-1]
                     parts.extend(["-f", f"bestvideo[height<={height}]+bestaudio/best[height<={height}]"])
             else:
-                logger.debug(f"Format: {request.format}")
+                if debug:
+                    logger.debug("Format: %s", request.format)
                 parts.extend(["-f", request.format])
         
         # Playlist options
@@ -68,7 +116,8 @@ class YtdlpClient:
             logger.debug("Disabling playlist download")
             parts.append("--no-playlist")
         if request.playlist_items:
-            logger.debug(f"Playlist items: {request.playlist_items}")
+            if debug:
+                logger.debug("Playlist items: %s", request.playlist_items)
             parts.extend(["-I", request.playlist_items])
         
         # Subtitle options
@@ -76,41 +125,38 @@ class YtdlpClient:
             logger.debug("Enabling subtitles")
             parts.append("--write-subs")
             if request.subtitle_lang:
-                logger.debug(f"Subtitle language: {request.subtitle_lang}")
+                if debug:
+                    logger.debug("Subtitle language: %s", request.subtitle_lang)
                 parts.extend(["--sub-lang", request.subtitle_lang])
         
         # Output template
         if request.output_template:
-            logger.debug(f"Output template: {request.output_template}")
+            if debug:
+                logger.debug("Output template: %s", request.output_template)
             parts.extend(["-o", request.output_template])
         
         # Add URL
         parts.append(request.url)
         
-        command = " ".join(parts)
-        logger.info(f"Built command: {command}")
+        command = shlex.join(parts)
+        logger.info("Built command: %s", command)
         return command
     
-    def _transform_download_urls(self, data: str) -> str:
+    def _transform_download_urls(self, data: bytes) -> bytes:
         """
         Transform relative download URLs to absolute URLs.
         
         Args:
-            data: HTML or text data that may contain download URLs
+            data: Raw HTML or text data that may contain download URLs
             
         Returns:
             Transformed data with absolute URLs
         """
-        # Pattern to match href="/download/..." in HTML
-        pattern = r'href="(/download/[^"]+)"'
-        
-        def replace_url(match):
-            relative_path = match.group(1)
-            absolute_url = f"{self.download_base_url}{relative_path}"
-            logger.debug(f"Transforming URL: {relative_path} -> {absolute_url}")
-            return f'href="{absolute_url}"'
+        if self._href_needle_b not in data:
+            return data
         
-        transformed = re.sub(pattern, replace_url, data)
+        transformed = data.replace(self._href_needle_b, self._href_replacement_b)
+        logger.debug("Transformed download URLs to base: %s", self.download_base_url)
         return transformed
     
     def build_custom_command(self, url: str, params: List[str]) -> str:
@@ -124,68 +170,161 @@ class YtdlpClient:
         Returns:
             yt-dlp command string
         """
-        logger.debug(f"Building custom command: url={url}, params={params}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Building custom command: url=%s, params=%s", url, params)
         parts = ["yt-dlp"] + params + [url]
-        command = " ".join(parts)
-        logger.info(f"Built custom command: {command}")
+        command = shlex.join(parts)
+        logger.info("Built custom command: %s", command)
         return command
     
-    async def stream_download(self, command: str) -> AsyncGenerator[str, None]:
+    @staticmethod
+    async def _aiter_lines(response: httpx.Response) -> AsyncGenerator[bytes, None]:
         """
-        Stream download progress from ytdlp.online.
+        Split a streamed response body into lines.
+        
+        Raw chunks are accumulated in a byte buffer and only complete lines
+        are yielded, so an SSE line split across network chunks is
+        reassembled first. Like SSE itself, CRLF, LF and a bare CR all end a
+        line. Lines are left undecoded.
         
         Args:
-            command: yt-dlp command to execute
+            response: Streaming httpx response
             
         Yields:
-            Server-Sent Event data lines
+            Raw lines without their line terminator
         """
-        # URL encode the command
-        encoded_command = quote(command)
-        url = f"{self.base_url}/stream?command={encoded_command}"
+        buf = bytearray()
+        # Offset up to which buf is known to hold no line terminator
+        scan = 0
+        async for chunk in response.aiter_bytes():
+            buf.extend(chunk)
+            start = 0
+            for match in _EOL_RE.finditer(buf, scan):
+                if match.end() == len(buf) and buf[-1] == 0x0D:
+                    # A trailing CR may be the first half of a CRLF split across chunks
+                    break
+                yield bytes(buf[start:match.start()])
+                start = match.end()
+            if start:
+                del buf[:start]
+            scan = len(buf) - 1 if buf and buf[-1] == 0x0D else len(buf)
+        
+        # Trailing fragment; a final CR still terminates it
+        if buf:
+            yield bytes(buf[:-1] if buf[-1] == 0x0D else buf)
+    
+    async def open_stream(self, command: str) -> AsyncGenerator[bytes, None]:
+        """
+        Connect to the ytdlp.online stream and return its line relay.
         
-        logger.info(f"Starting SSE stream to ytdlp.online: {self.base_url}/stream")
-        logger.debug(f"Full SSE URL: {url}")
+        Connection and HTTP status errors are raised here, before any event
+        is relayed, so endpoints can still answer them with an error response.
+        The returned generator closes the upstream response when it is
+        exhausted or closed.
+        
+        Args:
+            command: yt-dlp command to execute
+            
+        Returns:
+            Async generator of Server-Sent Event lines as UTF-8 bytes, each
+            terminated with a newline
+        """
+        # The command is passed as a query parameter and encoded by httpx
+        url = f"{self.base_url}/stream"
+        params = {"command": command}
+        
+        debug = logger.isEnabledFor(logging.DEBUG)
+        logger.info("Starting SSE stream to ytdlp.online: %s", url)
+        if debug:
+            logger.debug("SSE request params: %s", params)
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                logger.debug(f"HTTP client created with timeout: {self.timeout}s")
-                
-                async with client.stream("GET", url) as response:
-                    logger.info(f"SSE connection established: status={response.status_code}")
-                    logger.debug(f"Response headers: {dict(response.headers)}")
-                    response.raise_for_status()
+            client = self._get_client()
+            request = client.build_request("GET", url, params=params)
+            response = await client.send(request, stream=True)
+        except httpx.TimeoutException as e:
+            logger.error("SSE stream timeout after %ss: %s", self.timeout, e)
+            raise
+        except httpx.HTTPError as e:
+            logger.error("SSE stream connection error: %s", e)
+            raise
+        
+        logger.info("SSE connection established: status=%s", response.status_code)
+        if debug:
+            logger.debug("Response headers: %s", dict(response.headers))
+        if response.is_error:
+            # Read the (short) error body so it can be logged, then release the connection
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            logger.error("SSE stream HTTP error: status=%s, body=%.200s", response.status_code, response.text)
+            response.raise_for_status()
+        
+        return self._relay_lines(response, debug)
+    
+    async def _relay_lines(self, response: httpx.Response, debug: bool) -> AsyncGenerator[bytes, None]:
+        """
+        Relay the lines of an open upstream stream.
+        
+        Args:
+            response: Streaming httpx response with a success status
+            debug: Whether per-line debug logging is enabled
+            
+        Yields:
+            Server-Sent Event lines as UTF-8 bytes, each terminated with a newline
+        """
+        try:
+            line_count = 0
+            async for line in self._aiter_lines(response):
+                if line:
+                    line_count += 1
+                    if debug:
+                        logger.debug("SSE line %d: %.100s...", line_count, line.decode("utf-8", "replace"))
                     
-                    line_count = 0
-                    async for line in response.aiter_lines():
-                        if line:
-                            line_count += 1
-                            logger.debug(f"SSE line {line_count}: {line[:100]}...")
-                            
-                            # Transform download URLs in data lines
-                            if line.startswith("data: "):
-                                data_content = line[6:]
-                                transformed_data = self._transform_download_urls(data_content)
-                                line = f"data: {transformed_data}"
-                                logger.debug(f"SSE data event (transformed): {line[6:50]}...")
-                            elif line.startswith("event: "):
-                                logger.debug(f"SSE event type: {line[7:]}")
-                            elif line.startswith("id: "):
-                                logger.debug(f"SSE event ID: {line[4:]}")
-                            
-                            yield line
+                    # Dispatch once on the SSE field name. Only data lines with a
+                    # relative download link are rewritten; everything else is
+                    # relayed as the exact bytes received, without a decode.
+                    colon = line.find(b":")
+                    if colon > 0:
+                        field = line[:colon]
+                        if field == b"data":
+                            if self._href_needle_b in line:
+                                line = self._transform_download_urls(line)
+                                if debug:
+                                    logger.debug("SSE data event (transformed): %.50s...", line.decode("utf-8", "replace"))
+                        elif debug:
+                            if field == b"event":
+                                logger.debug("SSE event type: %s", line[colon + 1:].lstrip().decode("utf-8", "replace"))
+                            elif field == b"id":
+                                logger.debug("SSE event ID: %s", line[colon + 1:].lstrip().decode("utf-8", "replace"))
                     
-                    logger.info(f"SSE stream completed: {line_count} lines received")
+                    yield line + b"\n"
+            
+            logger.info("SSE stream completed: %d lines received", line_count)
         
         except httpx.TimeoutException as e:
-            logger.error(f"SSE stream timeout after {self.timeout}s: {e}")
-            raise
-        except httpx.HTTPStatusError as e:
-            logger.error(f"SSE stream HTTP error: status={e.response.status_code}, body={e.response.text[:200]}")
+            logger.error("SSE stream timeout after %ss: %s", self.timeout, e)
             raise
         except Exception as e:
-            logger.error(f"SSE stream error: {e}", exc_info=True)
+            # The caller reports the traceback of the re-raised error
+            logger.error("SSE stream error: %s", e)
             raise
+        finally:
+            await response.aclose()
+    
+    async def stream_download(self, command: str) -> AsyncGenerator[bytes, None]:
+        """
+        Stream download progress from ytdlp.online.
+        
+        Args:
+            command: yt-dlp command to execute
+            
+        Yields:
+            Server-Sent Event lines as UTF-8 bytes, each terminated with a newline
+        """
+        async for line in await self.open_stream(command):
+            yield line
     
     async def download_sync(self, command: str) -> Dict[str, any]:
         """
@@ -197,7 +336,11 @@ class YtdlpClient:
         Returns:
             Dictionary with download results
         """
-        logger.info(f"Starting synchronous download with command: {command}")
+        # Level is checked once per download rather than per line. It is not
+        # cached on the client: the shared instance is created at import time,
+        # before setup_logging() has applied the configured level.
+        debug = logger.isEnabledFor(logging.DEBUG)
+        logger.info("Starting synchronous download with command: %s", command)
         
         result = {
             "status": DownloadStatus.PENDING,
@@ -211,69 +354,84 @@ class YtdlpClient:
         
         try:
             line_count = 0
-            async for line in self.stream_download(command):
+            async for line in await self.open_stream(command):
                 line_count += 1
                 
                 # Parse SSE format
-                if line.startswith("data: "):
-                    data = line[6:].strip()
-                    logger.debug(f"Sync download data [{line_count}]: {data[:100]}...")
+                if line.startswith(b"data: "):
+                    data = line[6:].decode("utf-8", "replace").strip()
+                    if debug:
+                        logger.debug("Sync download data [%d]: %.100s...", line_count, data)
                     
-                    # Extract download URL from completion message
-                    # Format (now absolute): <a href="https://ytdlp.online/download/filename.mp4" target="_blank">Download File</a>
-                    # The URL is already transformed to absolute by stream_download
-                    url_match = re.search(r'href="(https?://[^"]+/download/[^"]+)"', data)
-                    if url_match:
-                        result["download_url"] = url_match.group(1)
-                        logger.info(f"Download URL extracted: {result['download_url']}")
+                    # Single pass over the line: every href/progress match is
+                    # recorded, completion and error markers are only noted
+                    done = failed = False
+                    for match in _SSE_EVENT_RE.finditer(data):
+                        kind = match.lastgroup
                         
-                        # Extract filename from the full URL
-                        filename_match = re.search(r'/download/(.+)$', result["download_url"])
-                        if filename_match:
-                            # URL decode the filename
-                            from urllib.parse import unquote
-                            result["filename"] = unquote(filename_match.group(1))
-                            logger.info(f"Filename extracted: {result['filename']}")
-                    
-                    # Extract progress information
-                    # Format: [download]  50.0% of 4.24MiB at 500KiB/s ETA 00:04
-                    progress_match = re.search(r'\[download\]\s+(\d+\.?\d*)%\s+of\s+([\d.]+\w+)', data)
-                    if progress_match:
-                        percent = float(progress_match.group(1))
-                        size = progress_match.group(2)
+                        # Extract download URL from completion message
+                        # Format (now absolute): <a href="https://ytdlp.online/download/filename.mp4" target="_blank">Download File</a>
+                        # The URL is already transformed to absolute by the stream relay
+                        if kind == "href":
+                            result["download_url"] = match.group("href")
+                            logger.info("Download URL extracted: %s", result['download_url'])
+                            
+                            # Extract filename from the full URL
+                            filename_match = _FILENAME_RE.search(result["download_url"])
+                            if filename_match:
+                                # URL decode the filename
+                                result["filename"] = unquote(filename_match.group(1))
+                                logger.info("Filename extracted: %s", result['filename'])
                         
-                        logger.info(f"Download progress: {percent}% of {size}")
+                        # Extract progress information
+                        # Format: [download]  50.0% of 4.24MiB at 500KiB/s ETA 00:04
+                        elif kind == "size":
+                            pct = match.group("pct")
+                            percent = float(pct)
+                            size = match.group("size")
+                            
+                            logger.info("Download progress: %s%% of %s", percent, size)
+                            
+                            last_progress = DownloadProgress(
+                                status=DownloadStatus.DOWNLOADING,
+                                message=f"{percent}% of {size}",
+                                percent=percent
+                            )
+                            result["status"] = DownloadStatus.DOWNLOADING
+                            # The progress branch consumes the "100%" marker itself
+                            if pct == "100":
+                                done = True
                         
-                        last_progress = DownloadProgress(
-                            status=DownloadStatus.DOWNLOADING,
-                            message=f"{percent}% of {size}",
-                            percent=percent
-                        )
-                        result["status"] = DownloadStatus.DOWNLOADING
+                        elif kind == "done":
+                            done = True
+                        else:
+                            failed = True
                     
                     # Check for completion
-                    if "Command execution completed" in data or "100%" in data:
+                    if done:
                         result["status"] = DownloadStatus.COMPLETED
                         result["message"] = "Download completed successfully"
                         logger.info("Download completed successfully")
                         
                         if last_progress:
-                            last_progress.status = DownloadStatus.COMPLETED
-                            result["progress"] = last_progress.model_dump()
+                            result["progress"] = last_progress.model_copy(
+                                update={"status": DownloadStatus.COMPLETED}
+                            ).model_dump()
                         break
                     
                     # Check for errors
-                    if "error" in data.lower() or "failed" in data.lower():
+                    if failed:
                         result["status"] = DownloadStatus.FAILED
                         result["message"] = data
-                        logger.error(f"Download failed: {data}")
+                        logger.error("Download failed: %s", data)
                         
                         if last_progress:
-                            last_progress.status = DownloadStatus.FAILED
-                            result["progress"] = last_progress.model_dump()
+                            result["progress"] = last_progress.model_copy(
+                                update={"status": DownloadStatus.FAILED}
+                            ).model_dump()
                         break
                 
-                elif line.startswith("event: close"):
+                elif line.startswith(b"event: close"):
                     # Stream closed
                     logger.info("SSE stream closed event received")
                     if result["status"] == DownloadStatus.PENDING:
@@ -282,34 +440,37 @@ class YtdlpClient:
                     break
             
             logger.info(
-                f"Sync download finished: status={result['status']}, "
-                f"lines_processed={line_count}, "
-                f"download_url={'present' if result['download_url'] else 'missing'}"
+                "Sync download finished: status=%s, lines_processed=%d, download_url=%s",
+                result['status'].value, line_count, 'present' if result['download_url'] else 'missing'
             )
         
         except httpx.TimeoutException:
             result["status"] = DownloadStatus.FAILED
             result["message"] = f"Download timeout after {self.timeout} seconds"
-            logger.error(f"Download timeout after {self.timeout}s")
+            logger.error("Download timeout after %ss", self.timeout)
         except Exception as e:
             result["status"] = DownloadStatus.FAILED
             result["message"] = f"Download failed: {str(e)}"
-            logger.error(f"Download failed with exception: {e}", exc_info=True)
+            # Upstream HTTP errors were already logged by the stream itself
+            logger.error(
+                "Download failed with exception: %s", e,
+                exc_info=not isinstance(e, httpx.HTTPError)
+            )
         
         return result
     
-    def parse_sse_line(self, line: str) -> Optional[Dict[str, str]]:
+    def parse_sse_line(self, line: bytes) -> Optional[Dict[str, str]]:
         """
         Parse a Server-Sent Event line.
         
         Args:
-            line: SSE line to parse
+            line: SSE line to parse, as yielded by stream_download
             
         Returns:
-            Dictionary with event type and data, or None
+            Dictionary with event type and decoded data, or None
         """
-        if line.startswith("data: "):
-            return {"type": "data", "content": line[6:].strip()}
-        elif line.startswith("event: "):
-            return {"type": "event", "content": line[7:].strip()}
+        if line.startswith(b"data: "):
+            return {"type": "data", "content": line[6:].strip().decode("utf-8", "replace")}
+        elif line.startswith(b"event: "):
+            return {"type": "event", "content": line[7:].strip().decode("utf-8", "replace")}
         return None
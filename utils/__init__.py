@@ -1,5 +1,5 @@
 """Utilities package for ytdlp-online application."""
 
-from .logger import get_logger, get_sse_logger, setup_logging
+from .logger import get_logger, get_sse_logger, setup_logging, shutdown_logging
 
-__all__ = ['get_logger', 'get_sse_logger', 'setup_logging']
+__all__ = ['get_logger', 'get_sse_logger', 'setup_logging', 'shutdown_logging']
@@ -1,19 +1,22 @@
 """Logging utility module for ytdlp-online application.
 
 This module provides centralized logging configuration with:
-- Colored console output (always enabled)
+- Colored console output (when stdout is a terminal)
 - Optional file logging with rotation
+- Non-blocking emission through a background queue listener
 - SSE stream monitoring utilities
 """
 
+import itertools
 import logging
+import queue
 import sys
+import time
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
-from typing import Optional
-import uuid
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional, Tuple, Union
 from contextlib import contextmanager
+from dataclasses import dataclass, field
 
 
 # Try to import colorlog for colored console output
@@ -23,46 +26,105 @@ try:
 except ImportError:
     HAS_COLORLOG = False
 
+# Process-local source of SSE stream IDs
+_stream_counter = itertools.count()
+
+# Queue listener started by the most recent setup_logging() call
+_queue_listener: Optional[QueueListener] = None
+
+
+@dataclass(slots=True)
+class _StreamState:
+    """Tracking state of a single SSE stream."""
+    start_time: float
+    last_flush: float
+    events_sent: int = 0
+    bytes_sent: int = 0
+    buffer: List[Tuple[float, Union[str, bytes]]] = field(default_factory=list)
+
 
 class SSEStreamLogger:
-    """Utility class for tracking and logging SSE stream connections."""
+    """Utility class for tracking and logging SSE stream connections.
     
-    def __init__(self, logger: logging.Logger):
+    Per-event debug output is buffered per stream and emitted as a single
+    record once ``flush_events`` events are pending or the stream ends.
+    There is no background timer: ``flush_interval`` is only checked when
+    an event arrives, and events pending from before a longer gap are
+    flushed first, so a stalled stream holds its last batch until it
+    resumes or ends.
+    """
+    
+    def __init__(self, logger: logging.Logger, flush_events: int = 64, flush_interval: float = 0.5):
         self.logger = logger
-        self.active_streams = {}
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.active_streams: Dict[str, _StreamState] = {}
     
     def start_stream(self, stream_id: Optional[str] = None) -> str:
         """Start tracking a new SSE stream.
         
         Args:
-            stream_id: Optional stream ID, will generate UUID if not provided
+            stream_id: Optional stream ID, will generate a sequential ID if not provided
             
         Returns:
             Stream ID
         """
         if stream_id is None:
-            stream_id = str(uuid.uuid4())[:8]
+            stream_id = f"s{next(_stream_counter):08x}"
         
-        self.active_streams[stream_id] = {
-            'start_time': datetime.now(),
-            'events_sent': 0,
-            'bytes_sent': 0
-        }
+        now = time.monotonic()
+        self.active_streams[stream_id] = _StreamState(start_time=now, last_flush=now)
         
-        self.logger.info(f"SSE stream started: {stream_id}")
+        self.logger.info("SSE stream started: %s", stream_id)
         return stream_id
     
-    def log_event(self, stream_id: str, event_data: str):
+    def log_event(self, stream_id: str, event_data: Union[str, bytes]):
         """Log an SSE event.
         
         Args:
             stream_id: Stream ID
-            event_data: Event data content
+            event_data: Event data content (str or UTF-8 encoded bytes)
         """
-        if stream_id in self.active_streams:
-            self.active_streams[stream_id]['events_sent'] += 1
-            self.active_streams[stream_id]['bytes_sent'] += len(event_data.encode('utf-8'))
-            self.logger.debug(f"SSE [{stream_id}] Event sent: {event_data[:100]}...")
+        state = self.active_streams.get(stream_id)
+        if state is not None:
+            state.events_sent += 1
+            if isinstance(event_data, bytes) or event_data.isascii():
+                state.bytes_sent += len(event_data)
+            else:
+                state.bytes_sent += len(event_data.encode('utf-8'))
+            
+            if self.logger.isEnabledFor(logging.DEBUG):
+                now = time.monotonic()
+                # Emit what was pending before the gap, not together with this event
+                if now - state.last_flush >= self.flush_interval:
+                    self._flush(stream_id, state, now)
+                buffer = state.buffer
+                buffer.append((now, event_data))
+                if len(buffer) >= self.flush_events:
+                    self._flush(stream_id, state, now)
+    
+    def _flush(self, stream_id: str, state: _StreamState, now: float):
+        """Emit buffered events of a stream as a single debug record.
+        
+        Args:
+            stream_id: Stream ID
+            state: Tracking state of the stream
+            now: Current monotonic time
+        """
+        buffer = state.buffer
+        state.last_flush = now
+        if not buffer:
+            return
+        
+        first_ts = buffer[0][0]
+        lines = []
+        for ts, event_data in buffer:
+            if isinstance(event_data, bytes):
+                event_data = event_data[:100].rstrip().decode('utf-8', 'replace')
+            lines.append(f"  +{ts - first_ts:.3f}s {event_data[:100]}")
+        buffer.clear()
+        
+        self.logger.debug("SSE [%s] %d events sent:\n%s", stream_id, len(lines), "\n".join(lines))
     
     def end_stream(self, stream_id: str, normal: bool = True):
         """End tracking an SSE stream.
@@ -71,19 +133,17 @@ class SSEStreamLogger:
             stream_id: Stream ID
             normal: Whether the stream ended normally
         """
-        if stream_id in self.active_streams:
-            stream_info = self.active_streams[stream_id]
-            duration = (datetime.now() - stream_info['start_time']).total_seconds()
+        state = self.active_streams.pop(stream_id, None)
+        if state is not None:
+            now = time.monotonic()
+            self._flush(stream_id, state, now)
+            duration = now - state.start_time
             
             status = "completed" if normal else "abnormally terminated"
             self.logger.info(
-                f"SSE stream {status}: {stream_id} | "
-                f"Duration: {duration:.2f}s | "
-                f"Events: {stream_info['events_sent']} | "
-                f"Bytes: {stream_info['bytes_sent']}"
+                "SSE stream %s: %s | Duration: %.2fs | Events: %d | Bytes: %d",
+                status, stream_id, duration, state.events_sent, state.bytes_sent
             )
-            
-            del self.active_streams[stream_id]
     
     @contextmanager
     def stream_context(self, stream_id: Optional[str] = None):
@@ -100,14 +160,42 @@ class SSEStreamLogger:
             yield sid
             self.end_stream(sid, normal=True)
         except Exception as e:
-            self.logger.error(f"SSE stream error [{sid}]: {e}", exc_info=True)
+            self.logger.error("SSE stream error [%s]: %s", sid, e, exc_info=True)
             self.end_stream(sid, normal=False)
             raise
 
 
+def shutdown_logging():
+    """Stop the background queue listener, flushing pending records.
+    
+    The root logger's QueueHandler is replaced by the listener's own
+    handlers, so records logged afterwards (e.g. by a later app start in
+    the same process) are still emitted, synchronously. Safe to call more
+    than once; does nothing when no listener is running.
+    """
+    global _queue_listener
+    listener = _queue_listener
+    if listener is None:
+        return
+    _queue_listener = None
+    
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root_logger.removeHandler(handler)
+    for handler in listener.handlers:
+        root_logger.addHandler(handler)
+    listener.stop()
+
+
 def setup_logging(log_level: int, enable_file: bool = False, log_file: str = "logs/app.log"):
     """Setup application logging with console and optional file handlers.
     
+    The console and file handlers are owned by a QueueListener running in a
+    background thread; the root logger only gets a QueueHandler, so logging
+    calls never block the event loop on stream or disk I/O. Call
+    shutdown_logging() on shutdown to flush pending records.
+    
     Args:
         log_level: Python logging level constant (e.g., logging.INFO)
         enable_file: Whether to enable file logging
@@ -117,15 +205,19 @@ def setup_logging(log_level: int, enable_file: bool = False, log_file: str = "lo
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
     
-    # Clear any existing handlers
+    # Clear any existing handlers and stop the listener that served them
+    shutdown_logging()
     root_logger.handlers.clear()
+    handlers = []
     
     # Create formatter
     log_format = '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
     date_format = '%Y-%m-%d %H:%M:%S'
     
     # Console handler (always enabled)
-    if HAS_COLORLOG:
+    # Colors only help on a terminal; piped/container output gets the plain formatter
+    use_color = HAS_COLORLOG and sys.stdout.isatty()
+    if use_color:
         # Use colored output if colorlog is available
         console_formatter = colorlog.ColoredFormatter(
             '%(log_color)s%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
@@ -144,7 +236,7 @@ def setup_logging(log_level: int, enable_file: bool = False, log_file: str = "lo
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
     console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # File handler (optional)
     if enable_file:
@@ -161,13 +253,22 @@ def setup_logging(log_level: int, enable_file: bool = False, log_file: str = "lo
         )
         file_handler.setLevel(log_level)
         file_handler.setFormatter(file_formatter)
-        root_logger.addHandler(file_handler)
-        
-        root_logger.info(f"File logging enabled: {log_file}")
+        handlers.append(file_handler)
+    
+    # Route all records through a queue drained by a background thread
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    global _queue_listener
+    _queue_listener = listener
+    
+    if enable_file:
+        root_logger.info("File logging enabled: %s", log_file)
     else:
         root_logger.info("File logging disabled (console only)")
     
-    root_logger.info(f"Logging initialized at level: {logging.getLevelName(log_level)}")
+    root_logger.info("Logging initialized at level: %s", logging.getLevelName(log_level))
 
 
 def get_logger(name: str) -> logging.Logger: